@@ -0,0 +1,111 @@
+import sys
+import cv2
+import math
+from pathlib import Path
+import logging
+import time
+import airsim
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.drone_controller import DroneController
+
+def collect_calibration_frames(out_dir='calib', num_frames=500, sample_interval=0.25,
+                               altitudes=(6.0, 8.0, 10.0, 12.0, 14.0)):
+
+    images_dir = Path(out_dir) / 'images'
+    images_dir.mkdir(parents=True, exist_ok=True)
+
+    drone = DroneController()
+
+    if not drone.connect():
+        logger.error("Connection failed!")
+        return
+    logger.info("Connected")
+
+    if not drone.enable_api_control():
+        logger.error("API control failed!")
+        drone.disconnect()
+        return
+
+    if not drone.arm():
+        logger.error("Arm failed!")
+        drone.disconnect()
+        return
+
+    if not drone.takeoff(altitude=altitudes[0]):
+        drone.disconnect()
+        return
+
+    # Same square survey as live_detection, flown in laps at several altitudes.
+    # Frames are sampled every sample_interval seconds over each whole lap, so
+    # the set covers the path and altitudes instead of back-to-back duplicates
+    side = 20.0
+    speed = 5.0
+    corners = [(0.0, 0.0), (side, 0.0), (side, side), (0.0, side), (0.0, 0.0)]
+    path_length = sum(
+        math.dist(a, b) for a, b in zip(corners, corners[1:])
+    )
+    lap_duration = path_length / speed
+    per_lap = max(1, int(lap_duration / sample_interval))
+    logger.info(f"~{per_lap} frames per {lap_duration:.0f}s lap, "
+                f"{math.ceil(num_frames / per_lap)} lap(s) needed")
+
+    saved = 0
+    lap = 0
+    try:
+        while saved < num_frames:
+            z = -altitudes[lap % len(altitudes)]
+            lap += 1
+            logger.info(f"Lap {lap} at {-z:.0f}m")
+
+            move = drone.client.moveOnPathAsync(
+                [airsim.Vector3r(x, y, z) for (x, y) in corners],
+                speed,
+                timeout_sec=float('inf'),
+                drivetrain=airsim.DrivetrainType.ForwardOnly,
+                yaw_mode=airsim.YawMode(False, 0),
+                lookahead=5.0,
+                adaptive_lookahead=1.0
+            )
+
+            start = time.monotonic()
+            next_sample = start
+            while saved < num_frames and time.monotonic() - start < lap_duration:
+                now = time.monotonic()
+                if now < next_sample:
+                    time.sleep(next_sample - now)
+                    continue
+                # Schedule from now so a slow capture never causes a catch-up burst
+                next_sample = now + sample_interval
+
+                img = drone.capture_image()
+
+                if img is None:
+                    continue
+
+                cv2.imwrite(str(images_dir / f"calib_{saved:04d}.jpg"), img)
+                saved += 1
+
+                if saved % 50 == 0:
+                    logger.info(f"Saved {saved}/{num_frames} frames")
+
+            # Let the lap finish (climb/descent makes it run a bit longer)
+            move.join()
+
+    except KeyboardInterrupt:
+        logger.info("\nInterrupted")
+    finally:
+        drone.land()
+        drone.disconnect()
+        logger.info(f"Calibration frames saved: {saved} -> {images_dir}")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    collect_calibration_frames(num_frames=count)
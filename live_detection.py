@@ -1,5 +1,6 @@
 import sys
 import cv2
+import queue
 from pathlib import Path
 import logging
 import time
@@ -15,6 +16,14 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.drone_controller import DroneController
 from src.crack_detector import TrainedCrackDetector
+from src.pipeline import DetectionPipeline
+from src.display import FrameDisplay
+
+# Key codes, resolved once
+_Q, _S, _F, _PLUS, _EQ, _MINUS, _UND = map(ord, 'qsf+=-_')
+
+def _noop():
+    return False
 
 def live_detection():
     
@@ -47,8 +56,12 @@ def live_detection():
 
     
 
+    # Frames per inference call, 4 is the throughput/energy sweet spot
+    batch_size = 4
+    
     try:
-        detector = TrainedCrackDetector(model_path='best.pt', device=None)
+        detector = TrainedCrackDetector(model_path='best.pt', device=None,
+                                        batch=batch_size)
         logger.info("Detector intialized")
     except Exception as e:
         logger.error(f"Detector failed: {e}")
@@ -81,107 +94,147 @@ def live_detection():
     ]
 
     speed = 5.0
-    drone.client.moveOnPathAsync(
-        [airsim.Vector3r(x, y, z) for (x, y, z) in waypoints],
-        speed,
-        timeout_sec=float('inf'),
-        drivetrain=airsim.DrivetrainType.ForwardOnly,
-        yaw_mode=airsim.YawMode(False, 0),
-        lookahead=5.0,
-        adaptive_lookahead=1.0
-    )
-    
+    pipeline = None
     try:
+        drone.client.moveOnPathAsync(
+            [airsim.Vector3r(x, y, z) for (x, y, z) in waypoints],
+            speed,
+            timeout_sec=float('inf'),
+            drivetrain=airsim.DrivetrainType.ForwardOnly,
+            yaw_mode=airsim.YawMode(False, 0),
+            lookahead=5.0,
+            adaptive_lookahead=1.0
+        )
+    
+        # Capture and inference run on worker threads, only the freshest frames are
+        # kept; of each batch of 4 the newest frame is displayed. The capture thread
+        # keeps one image request in flight while it hands off the previous frame
+        stream = drone.image_stream()
+        pipeline = DetectionPipeline(
+            capture_fn=lambda: (True, next(stream)),
+            detect_fn=lambda imgs: detector.detect_batch(imgs, conf=confidence_th),
+            batch_size=batch_size,
+            close_fn=stream.close,
+        )
+        pipeline.start()
+        display = FrameDisplay()
+    
+        # Create the window up front instead of implicitly on the first imshow
+        window_name = "Live Crack Detection"
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        prev_fullscreen = None
+        overlay = None
+        shown_frame = 0
+    
+        # Key handlers return True to stop the loop
+        def quit_fn():
+            logger.info("quit - disconnecting...")
+            return True
+    
+        def save_fn():
+            if overlay is None:
+                return
+            filename = f"detection_frame_{shown_frame:04d}.jpg"
+            cv2.imwrite(filename, overlay)
+            logger.info(f"Annotated frame saved: {filename}")
+    
+        def fullscreen_fn():
+            nonlocal fullscreen
+            fullscreen = not fullscreen
+            logger.info(f"Fullscreen: {'ON' if fullscreen else 'OFF'}")
+    
+        def conf_up_fn():
+            nonlocal confidence_th
+            confidence_th = min(1.0, confidence_th + 0.05)
+            logger.info(f"Confidence threshold: {confidence_th:.2f}")
+    
+        def conf_down_fn():
+            nonlocal confidence_th
+            confidence_th = max(0.0, confidence_th - 0.05)
+            logger.info(f"Confidence threshold: {confidence_th:.2f}")
+    
+        keymap = {
+            _Q: quit_fn,
+            _S: save_fn,
+            _F: fullscreen_fn,
+            _PLUS: conf_up_fn,
+            _EQ: conf_up_fn,
+            _MINUS: conf_down_fn,
+            _UND: conf_down_fn,
+        }
+    
         while True:
-            # Capturing image
-            img = drone.capture_image()
-            
-            if img is None:
+            try:
+                item = pipeline.get(timeout=1.0)
+            except queue.Empty:
                 continue
             
+            if item is None:
+                logger.error("Capture stopped")
+                break
+            
+            img, detection_results = item
             frame_count += 1
             
             #detection
-            try:
-                detection_results = detector.detect(img, conf=confidence_th)
+            if detection_results is not None:
                 anomaly_count = detection_results['anomaly_count']
                 img_annotated = detection_results['image_annotated']
                 total_crack += anomaly_count
                 
                 if anomaly_count > 0:
                     logger.info(f"Crack Detected {frame_count}: {anomaly_count} crack(s)")
-                
-            except Exception as e:
-                logger.error(f"Detection error: {e}")
-                img_annotated = img.copy()
-                anomaly_count = 0
-            
-            #current position
-            pos = drone.get_position()
-            
-            #text overlays
-            overlay = img_annotated.copy()
-            
-            
-            
-            # Frame and detection stats
-            frame_text = f"Frame: {frame_count} | Cracks in frame: {anomaly_count} | Total: {total_crack}"
-            cv2.putText(
-                overlay, frame_text, (10, 70),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6,
-                (0, 255, 0), 2
-            )
-            
-            
-            # Anomaly status (highlight if detected)
-            if anomaly_count > 0:
-                status_text = f"CRACK DETECTED!"
-                color = (0, 0, 255)  # Red
             else:
-                status_text = "No anomalies"
-                color = (0, 255, 0)  # Green
-            
-            cv2.putText(
-                overlay, status_text, (10, 190),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8,
-                color, 3
-            )
-            
-            # Resize for display
-            overlay = cv2.resize(overlay, (1920, 1080))  # Full
-
-            
-            # Display
-            window_name = "Live Crack Detection"
-            cv2.imshow(window_name, overlay)
+                img_annotated = None
+                anomaly_count = 0
             
-            # Handle fullscreen
-            if fullscreen:
-                cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, 
-                                     cv2.WINDOW_FULLSCREEN)
+            # Only draw frames that will actually be shown: skip this one if a
+            # newer frame of the same batch is already queued, or if the 30 FPS
+            # display cap would drop it anyway
+            if pipeline.pending() or not display.due():
+                key = display.poll_key()
             else:
-                cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, 
-                                     cv2.WINDOW_NORMAL)
+                #text overlays, drawn in place: result.plot() already returns a fresh array
+                overlay = img_annotated if img_annotated is not None else img.copy()
+                shown_frame = frame_count
+                
+                # Frame and detection stats
+                frame_text = f"Frame: {frame_count} | Cracks in frame: {anomaly_count} | Total: {total_crack}"
+                cv2.putText(
+                    overlay, frame_text, (10, 70),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                    (0, 255, 0), 2
+                )
+                
+                
+                # Anomaly status (highlight if detected)
+                if anomaly_count > 0:
+                    status_text = f"CRACK DETECTED!"
+                    color = (0, 0, 255)  # Red
+                else:
+                    status_text = "No anomalies"
+                    color = (0, 255, 0)  # Green
+                
+                cv2.putText(
+                    overlay, status_text, (10, 190),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                    color, 3
+                )
+                
+                # Resize for display
+                overlay = display.resize(overlay, (1920, 1080))  # Full
+                
+                # Display, capped at 30 FPS
+                key = display.show(window_name, overlay)
             
-            # Check for key press
-            key = cv2.waitKey(1) & 0xFF
+            # Handle fullscreen, only when the state changes
+            if fullscreen != prev_fullscreen:
+                mode = cv2.WINDOW_FULLSCREEN if fullscreen else cv2.WINDOW_NORMAL
+                cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, mode)
+                prev_fullscreen = fullscreen
             
-            if key == ord('q'):  # Quit
-                logger.info("quit - disconnecting...")
+            if keymap.get(key, _noop)():
                 break
-            elif key == ord('s'):  # Save frame
-                filename = f"detection_frame_{frame_count:04d}.jpg"
-                cv2.imwrite(filename, overlay)
-                logger.info(f"Annotated frame saved: {filename}")
-            elif key == ord('f'):  # Toggle fullscreen
-                fullscreen = not fullscreen
-                logger.info(f"Fullscreen: {'ON' if fullscreen else 'OFF'}")
-            elif key == ord('+') or key == ord('='):  # Increase confidence
-                confidence_th = min(1.0, confidence_th + 0.05)
-                logger.info(f"Confidence threshold: {confidence_th:.2f}")
-            elif key == ord('-') or key == ord('_'):  # Decrease confidence
-                confidence_th = max(0.0, confidence_th - 0.05)
-                logger.info(f"Confidence threshold: {confidence_th:.2f}")
     
     except KeyboardInterrupt:
         logger.info("\nInterrupted")
@@ -190,8 +243,14 @@ def live_detection():
         import traceback
         traceback.print_exc()
     finally:
+        # The AirSim client is not thread-safe: if the capture thread is still
+        # stuck on it, land over a separate connection instead
+        alive = pipeline.stop() if pipeline is not None else []
         cv2.destroyAllWindows()
-        drone.land()
+        if 'capture' in alive:
+            drone.land_on_new_connection()
+        else:
+            drone.land()
         drone.disconnect()
         
 
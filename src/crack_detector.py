@@ -1,5 +1,9 @@
 
 import os
+import glob
+import shutil
+import hashlib
+import numpy as np
 import torch
 import cv2
 import logging
@@ -14,12 +18,92 @@ except:
 
 from ultralytics import YOLO
 
+from src.int8_engine import build_int8_engine
+
+# Inference only: let cuDNN pick the fastest kernels once per input shape.
+# Grad mode is thread-local, so detect_batch also enters inference_mode
+# itself for the pipeline's worker thread
+torch.backends.cudnn.benchmark = True
+torch.set_grad_enabled(False)
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _apply_luma_delta(src, old_l, new_l, out):
+        # Shift every channel by the CLAHE change in luma, one read and one write
+        h, w = old_l.shape
+        for y in prange(h):
+            for x in range(w):
+                d = np.int16(new_l[y, x]) - np.int16(old_l[y, x])
+                for c in range(3):
+                    v = np.int16(src[y, x, c]) + d
+                    out[y, x, c] = min(max(v, 0), 255)
+
 class TrainedCrackDetector:
-    def __init__(self, model_path='best.pt', device='cuda'):
+    def __init__(self, model_path='best.pt', device='cuda', engine_path=None,
+                 imgsz=(736, 1280), int8=None, calib_dir='calib', batch=1):
         
         self.device = device
         self.model = None
+        self._clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        self.imgsz = imgsz
+        self.calib_dir = calib_dir
+        self.batch = batch
+        # int8=None: use INT8 once collect_calibration_frames.py has filled calib_dir
+        if int8 is None:
+            int8 = self._has_calib_frames()
+        self.int8 = int8
+        # Extra predict() arguments; a static TensorRT engine needs its export imgsz
+        self.predict_kwargs = {}
+        
+        # Fall back INT8 engine -> FP16 engine -> PyTorch weights
+        if engine_path is not None:
+            engines = [(engine_path, int8)]
+        else:
+            engines = [(self._engine_path(model_path, True), True)] if int8 else []
+            engines.append((self._engine_path(model_path, False), False))
         
+        for path, use_int8 in engines:
+            try:
+                self._load_checked_engine(model_path, path, use_int8)
+                self.int8 = use_int8
+                break
+            except Exception as e:
+                logger.warning(f"TensorRT engine unavailable ({path}): {e}")
+                self.model = None
+                self.predict_kwargs = {}
+        else:
+            logger.warning("Using PyTorch weights")
+            self.int8 = False
+            self._load_weights(model_path)
+            self._set_infer_size()
+            self._warmup()
+    
+    def _has_calib_frames(self):
+        images_dir = os.path.join(self.calib_dir, 'images')
+        return os.path.isdir(images_dir) and bool(os.listdir(images_dir))
+    
+    def _engine_path(self, model_path, int8):
+        suffix = '_int8' if int8 else ''
+        if self.batch > 1:
+            suffix += f'_b{self.batch}'
+        return os.path.splitext(model_path)[0] + suffix + '.engine'
+    
+    def _set_infer_size(self):
+        # (h, w) the model actually runs at: the engine's export size, or the
+        # training imgsz of the .pt weights
+        infer_size = self.predict_kwargs.get('imgsz')
+        if infer_size is None:
+            infer_size = self.model.overrides.get('imgsz', 640)
+        if isinstance(infer_size, int):
+            infer_size = (infer_size, infer_size)
+        self.infer_size = tuple(infer_size)
+    
+    def _load_weights(self, model_path):
         try:
             self._load_with_patch(model_path)
         except Exception as e:
@@ -30,6 +114,128 @@ class TrainedCrackDetector:
                 logger.error(f"failed: {e2}")
                 raise RuntimeError(f"Failed to load model: {e2}")
     
+    def _warmup(self, runs=3):
+        # First calls trigger autotuning and kernel caching, do them before
+        # the live loop starts instead of on the first real frames. Errors
+        # propagate: a model that cannot run these cannot run real frames either
+        h, w = self.infer_size
+        frames = [np.zeros((h, w, 3), np.uint8)] * self.batch
+
+        with torch.inference_mode():
+            for _ in range(runs):
+                self.model(frames, device=self.device, verbose=False, **self.predict_kwargs)
+        logger.info("Model warmed up")
+    
+    def _load_checked_engine(self, model_path, engine_path, int8):
+        # YOLO(engine_path) only records the path, the TensorRT backend is
+        # deserialised on the first predict. Only accept the engine once the
+        # warm-up inference ran on it; a cached engine that fails (stale, built
+        # for another GPU or TensorRT version) is deleted and rebuilt once
+        cached = os.path.exists(engine_path)
+        try:
+            self._start_engine(model_path, engine_path, int8)
+            return
+        except Exception as e:
+            if not cached:
+                raise
+            logger.warning(f"Cached engine failed, rebuilding {engine_path}: {e}")
+        
+        self.model = None
+        self.predict_kwargs = {}
+        os.remove(engine_path)
+        self._start_engine(model_path, engine_path, int8)
+    
+    def _start_engine(self, model_path, engine_path, int8):
+        self._load_engine(model_path, engine_path, int8)
+        self._set_infer_size()
+        self._warmup()
+    
+    def _load_engine(self, model_path, engine_path, int8):
+        # Build the FP16 (or INT8) engine once and reuse it on later runs
+        if not os.path.exists(engine_path):
+            logger.info(f"Exporting TensorRT engine: {engine_path}")
+            
+            # Ultralytics always writes <weights stem>.engine, so export from a
+            # copy of the weights named after the target engine; otherwise
+            # building best_b4.engine would overwrite a cached best.engine
+            export_weights = os.path.splitext(engine_path)[0] + '.pt'
+            copied = os.path.abspath(export_weights) != os.path.abspath(model_path)
+            if copied:
+                shutil.copyfile(model_path, export_weights)
+            
+            try:
+                self._load_with_patch(export_weights)
+                
+                if int8:
+                    self._build_int8_engine(model_path, engine_path)
+                else:
+                    # Batched engines get a dynamic batch axis (1..batch)
+                    exported = self.model.export(
+                        format='engine',
+                        half=True,
+                        simplify=True,
+                        dynamic=self.batch > 1,
+                        batch=self.batch,
+                        imgsz=self.imgsz,
+                        device=0,
+                        workspace=4,
+                    )
+                    if os.path.abspath(exported) != os.path.abspath(engine_path):
+                        os.replace(exported, engine_path)
+            finally:
+                if copied and os.path.exists(export_weights):
+                    os.remove(export_weights)
+        
+        # Engines are bound to the GPU they were built on, so no .to(device)
+        self.model = YOLO(engine_path, task='detect')
+        self.predict_kwargs = {'imgsz': self.imgsz}
+        logger.info(f"Engine loaded: {engine_path}")
+    
+    def _build_int8_engine(self, model_path, engine_path):
+        # Ultralytics forces dynamic=True for INT8 engine exports, and the
+        # entropy calibrator misbehaves on dynamic shapes (latency regresses
+        # badly). Export a static ONNX instead and calibrate it ourselves on
+        # frames captured from the drone camera (see
+        # collect_calibration_frames.py). The engine is static, so batched
+        # INT8 engines must always be fed full batches
+        images_dir = os.path.join(self.calib_dir, 'images')
+        if not self._has_calib_frames():
+            raise RuntimeError(f"No calibration frames in {images_dir}")
+        
+        onnx_path = self.model.export(
+            format='onnx',
+            simplify=True,
+            dynamic=False,
+            batch=self.batch,
+            imgsz=self.imgsz,
+        )
+        
+        build_int8_engine(
+            onnx_path,
+            engine_path,
+            images_dir,
+            imgsz=self.imgsz,
+            batch=self.batch,
+            workspace=4,
+            cache_path=self._calib_cache_path(model_path, images_dir),
+        )
+    
+    def _calib_cache_path(self, model_path, images_dir):
+        # The cached scales are only valid for these exact weights, input
+        # shape and frames, so key the cache on all of them; retraining,
+        # changing imgsz or recollecting frames then recalibrates
+        key = hashlib.sha1()
+        with open(model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                key.update(chunk)
+        key.update(repr((tuple(self.imgsz), self.batch)).encode())
+        for path in sorted(glob.glob(os.path.join(images_dir, '*'))):
+            stat = os.stat(path)
+            key.update(f'{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        return os.path.join(self.calib_dir, f'{stem}_{key.hexdigest()[:12]}.cache')
+    
     def _load_with_patch(self, model_path):
         # Patch torch.load globally
         original_load = torch.load
@@ -63,62 +269,102 @@ class TrainedCrackDetector:
             raise RuntimeError(f"Safe globals failed: {e}")
     
     def detect(self, image, conf=0.4):
+        return self.detect_batch([image], conf=conf)[0]
+    
+    def detect_batch(self, images, conf=0.4):
         
         if self.model is None:
-            return {
-                'anomaly_count': 0,
-                'image_annotated': image.copy(),
-                'cracks': [],
-                'confidence': conf,
-            }
+            return [self._empty_result(image, conf) for image in images]
         
         try:
-            # Run inference
-            results = self.model(image, conf=conf, device=self.device, verbose=False)
-            result = results[0]
-            
-            # Get boxes
-            boxes = result.boxes.cpu().numpy()
-            
-            # Counting detections
-            anomaly_count = len(boxes)
+            # Shrink large frames to the model input size once, up front,
+            # so the internal letterbox only has to pad
+            inputs, scales = zip(*(self._fit_to_model(image) for image in images))
             
-            # Annotate image
-            image_annotated = result.plot()
+            # Run inference on the whole batch in one call; box rescaling stays
+            # inside inference_mode since it edits the result tensors in place
+            with torch.inference_mode():
+                results = self.model(list(inputs), conf=conf, device=self.device,
+                                     verbose=False, **self.predict_kwargs)
+                results = [self._to_source(result, image, scale)
+                           for result, image, scale in zip(results, images, scales)]
             
-            # Extract crack information
-            cracks = []
-            for box in boxes:
-                try:
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    confidence = box.conf[0]
-                    
-                    crack_info = {
-                        'box': (int(x1), int(y1), int(x2), int(y2)),
-                        'confidence': float(confidence),
-                        'width': int(x2 - x1),
-                        'height': int(y2 - y1),
-                        'area': int((x2 - x1) * (y2 - y1)),
-                    }
-                    cracks.append(crack_info)
-                except:
-                    pass
-            
-            return {
-                'anomaly_count': anomaly_count,
-                'image_annotated': image_annotated,
-                'cracks': cracks,
-                'confidence': conf,
-            }
+            return [self._parse_result(result, conf) for result in results]
         
         except Exception as e:
             logger.error(f"Detection error: {e}")
-            return {
-                'anomaly_count': 0,
-                'image_annotated': image.copy(),
-                'cracks': [],
-                'confidence': conf,
+            return [self._empty_result(image, conf) for image in images]
+    
+    def _fit_to_model(self, image):
+        h, w = image.shape[:2]
+        max_h, max_w = self.infer_size
+        
+        if h <= max_h and w <= max_w:
+            return image, 1.0
+        
+        scale = min(max_h / h, max_w / w)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+    
+    def _to_source(self, result, image, scale):
+        # Map boxes from the downscaled input back onto the source frame, so
+        # image_annotated and cracks share the source coordinate space
+        if scale == 1.0:
+            return result
+        
+        data = result.boxes.data.clone()
+        data[:, :4] /= scale
+        result.orig_img = image
+        result.orig_shape = image.shape[:2]
+        result.update(boxes=data)
+        return result
+    
+    def _parse_result(self, result, conf):
+        # Get boxes: one device->host copy of [x1, y1, x2, y2, (id), conf, cls]
+        data = result.boxes.data.cpu().numpy()
+        
+        # Counting detections
+        anomaly_count = len(data)
+        
+        # Annotate image
+        image_annotated = result.plot()
+        
+        # Extract crack information
+        xyxy = data[:, :4]
+        confs = data[:, -2]
+        wh = xyxy[:, 2:] - xyxy[:, :2]
+        areas = wh[:, 0] * wh[:, 1]
+        
+        cracks = [
+            {
+                'box': tuple(box),
+                'confidence': confidence,
+                'width': width,
+                'height': height,
+                'area': area,
             }
+            for box, confidence, (width, height), area in zip(
+                xyxy.astype(np.int32).tolist(),
+                confs.tolist(),
+                wh.astype(np.int32).tolist(),
+                areas.astype(np.int64).tolist(),
+            )
+        ]
+        
+        return {
+            'anomaly_count': anomaly_count,
+            'image_annotated': image_annotated,
+            'cracks': cracks,
+            'confidence': conf,
+        }
+    
+    def _empty_result(self, image, conf):
+        return {
+            'anomaly_count': 0,
+            'image_annotated': image.copy(),
+            'cracks': [],
+            'confidence': conf,
+        }
     
     def detect_with_preprocessing(self, image, conf=0.4):
         # preprocessing
@@ -129,15 +375,18 @@ class TrainedCrackDetector:
     
     def _preprocess(self, image):
         try:
-            # Increase contrast
-            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            l = clahe.apply(l)
+            # Increase contrast: CLAHE on BT.601 luma, then move each pixel
+            # by the luma change instead of a full LAB round trip
+            luma = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            enhanced_luma = self._clahe.apply(luma)
             
-            enhanced = cv2.merge([l, a, b])
-            enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
+            if njit is not None:
+                enhanced = np.empty_like(image)
+                _apply_luma_delta(image, luma, enhanced_luma, enhanced)
+            else:
+                delta = enhanced_luma.astype(np.int16) - luma
+                enhanced = np.clip(image.astype(np.int16) + delta[..., None], 0, 255)
+                enhanced = enhanced.astype(np.uint8)
             
             return enhanced
         except:
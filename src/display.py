@@ -0,0 +1,118 @@
+import time
+import numpy as np
+import cv2
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _cuda_available():
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except Exception:
+        return False
+
+
+class FrameDisplay:
+    """Resizes frames for display into a buffer allocated once and caps
+    how often they are pushed to the window."""
+
+    def __init__(self, max_fps=30):
+        self._display = None
+        self.min_interval = 1.0 / max_fps
+        self._last_show = 0.0
+
+        # Resize on the GPU when OpenCV is built with CUDA
+        self.use_cuda = _cuda_available()
+        if self.use_cuda:
+            self._gpu_src = cv2.cuda_GpuMat()
+            self._gpu_dst = cv2.cuda_GpuMat()
+            logger.info("Display resize on CUDA")
+
+    def resize(self, frame, size):
+        width, height = size
+
+        # Never upscale, the window is resizable anyway
+        if frame.shape[1] <= width and frame.shape[0] <= height:
+            return frame
+
+        # Reallocate only if the target size changes
+        if self._display is None or self._display.shape[:2] != (height, width):
+            self._display = np.empty((height, width, 3), np.uint8)
+
+        if self.use_cuda:
+            self._gpu_src.upload(frame)
+            cv2.cuda.resize(self._gpu_src, (width, height), dst=self._gpu_dst,
+                            interpolation=cv2.INTER_LINEAR)
+            self._gpu_dst.download(self._display)
+        else:
+            cv2.resize(frame, (width, height), dst=self._display,
+                       interpolation=cv2.INTER_LINEAR)
+        return self._display
+
+    def due(self):
+        # True if the next frame would be shown rather than skipped, so
+        # callers can skip drawing frames that show() would drop
+        return time.monotonic() - self._last_show >= self.min_interval
+
+    def show(self, window_name, frame, delay=1):
+        # Returns the pressed key like cv2.waitKey(delay) & 0xFF
+        if not self.due():
+            return self.poll_key(delay)
+
+        cv2.imshow(window_name, frame)
+        self._last_show = time.monotonic()
+        return cv2.waitKey(delay) & 0xFF
+
+    def poll_key(self, delay=1):
+        # Pick up key presses for a frame that is not shown, without the GUI round trip
+        if delay <= 1 and hasattr(cv2, 'pollKey'):
+            return cv2.pollKey() & 0xFF
+        return cv2.waitKey(delay) & 0xFF
+
+
+class StaticText:
+    """Rarely changing text, rasterised once and blitted onto each frame.
+
+    labels is a tuple of (text, org, font, scale, color, thickness) in
+    cv2.putText order; the sprite is rebuilt only when it or the frame
+    shape changes.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._roi = None
+        self._sprite = None
+        self._mask = None
+
+    def draw(self, frame, labels):
+        key = (frame.shape, labels)
+        if key != self._key:
+            self._render(frame.shape, labels)
+            self._key = key
+
+        if self._roi is None:
+            return
+
+        # Copy only the text pixels inside the bounding box of all labels
+        y0, y1, x0, x1 = self._roi
+        np.copyto(frame[y0:y1, x0:x1], self._sprite, where=self._mask)
+
+    def _render(self, shape, labels):
+        canvas = np.zeros(shape, np.uint8)
+        mask = np.zeros(shape[:2], np.uint8)
+
+        for text, org, font, scale, color, thickness in labels:
+            cv2.putText(canvas, text, org, font, scale, color, thickness)
+            cv2.putText(mask, text, org, font, scale, 255, thickness)
+
+        ys, xs = np.nonzero(mask)
+        if len(ys) == 0:
+            self._roi = None
+            return
+
+        y0, y1 = ys.min(), ys.max() + 1
+        x0, x1 = xs.min(), xs.max() + 1
+        self._roi = (y0, y1, x0, x1)
+        self._sprite = canvas[y0:y1, x0:x1].copy()
+        self._mask = mask[y0:y1, x0:x1, None].astype(bool)
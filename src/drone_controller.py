@@ -1,8 +1,7 @@
-# src/drone_controller.py - FINAL FIX (Compressed Image Handling)
+# src/drone_controller.py - FINAL FIX (Uncompressed Image Handling)
 
 import airsim
 import numpy as np
-import cv2
 import logging
 import time
 from typing import Tuple, Dict
@@ -88,6 +87,22 @@ class DroneController:
             logger.error(f"Landing failed: {e}")
             return False
     
+    def land_on_new_connection(self) -> bool:
+        # For when another thread may still be blocked on self.client: a fresh
+        # client has its own socket and IOLoop, so landing never shares them
+        try:
+            logger.info("Landing drone over a new connection")
+            client = airsim.MultirotorClient()
+            client.confirmConnection()
+            client.enableApiControl(True)
+            client.landAsync().join()
+            client.armDisarm(False)
+            logger.info("Drone disarmed")
+            return True
+        except Exception as e:
+            logger.error(f"Landing failed: {e}")
+            return False
+    
     def fly_to_position(
         self,
         x: float,
@@ -178,24 +193,11 @@ class DroneController:
     def capture_image(self, camera_name: int = 0) -> np.ndarray:
         
         try:
-            # Get image from camera
-            response = self.client.simGetImage(camera_name, airsim.ImageType.Scene)
-            
-            if response is None or len(response) == 0:
-                logger.warning("Empty image response")
-                return None
+            # Request raw pixels so no PNG decode is needed
+            request = self._scene_request(camera_name)
+            response = self.client.simGetImages([request])[0]
             
-            img_array = np.frombuffer(response, dtype=np.uint8)
-            
-
-            img_bgr = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-            
-            if img_bgr is None:
-                logger.warning("Failed to decode image")
-                return None
-            
-            logger.debug(f"Captured image: {img_bgr.shape}")
-            return img_bgr
+            return self._decode_image(response)
             
         except Exception as e:
             logger.error(f"Failed to capture image: {e}")
@@ -203,6 +205,53 @@ class DroneController:
             traceback.print_exc()
             return None
     
+    def capture_image_async(self, camera_name: int = 0):
+        # Returns the msgpack-rpc future of a simGetImages call
+        request = self._scene_request(camera_name)
+        return self.client.client.call_async('simGetImages', [request], '', False)
+    
+    def wait_image(self, future) -> np.ndarray:
+        
+        try:
+            responses = future.get()
+            response = airsim.ImageResponse.from_msgpack(responses[0])
+            
+            return self._decode_image(response)
+            
+        except Exception as e:
+            logger.error(f"Failed to capture image: {e}")
+            return None
+    
+    def image_stream(self, camera_name: int = 0):
+        # Always keep the next request in flight, so the RPC round trip and
+        # the simulator render overlap with handing off the current frame.
+        # Close it from the thread that iterates it
+        pending = self.capture_image_async(camera_name)
+        try:
+            while True:
+                current, pending = pending, self.capture_image_async(camera_name)
+                yield self.wait_image(current)
+        finally:
+            # Read the in-flight response off the socket so the client is
+            # idle before any other thread uses it
+            self.wait_image(pending)
+    
+    def _scene_request(self, camera_name):
+        return airsim.ImageRequest(camera_name, airsim.ImageType.Scene, False, False)
+    
+    def _decode_image(self, response) -> np.ndarray:
+        if response is None or response.width == 0 or len(response.image_data_uint8) == 0:
+            logger.warning("Empty image response")
+            return None
+        
+        img_array = np.frombuffer(response.image_data_uint8, dtype=np.uint8)
+        
+        # Newer AirSim builds send BGR, older ones BGRA
+        img_bgr = img_array.reshape(response.height, response.width, -1)[:, :, :3]
+        
+        logger.debug(f"Captured image: {img_bgr.shape}")
+        return img_bgr
+    
     def hover(self, duration: float = 5.0) -> bool:
 
         try:
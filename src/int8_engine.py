@@ -0,0 +1,124 @@
+import os
+import json
+import glob
+import numpy as np
+import cv2
+import logging
+
+logger = logging.getLogger(__name__)
+
+_IMAGE_EXTS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+
+def letterbox(image, imgsz):
+    # Same padding Ultralytics applies to a static engine input: scale to fit,
+    # centre, pad with grey 114
+    h, w = image.shape[:2]
+    new_h, new_w = imgsz
+    r = min(new_h / h, new_w / w)
+    unpad_w, unpad_h = int(round(w * r)), int(round(h * r))
+
+    if (unpad_w, unpad_h) != (w, h):
+        image = cv2.resize(image, (unpad_w, unpad_h), interpolation=cv2.INTER_LINEAR)
+
+    dw, dh = (new_w - unpad_w) / 2, (new_h - unpad_h) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right,
+                              cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+
+def _to_input(image, imgsz):
+    # BGR HWC uint8 -> RGB CHW float32 in [0, 1], as the exported model expects
+    img = letterbox(image, imgsz)[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(img, dtype=np.float32) / 255.0
+
+
+def build_int8_engine(onnx_path, engine_path, images_dir, imgsz, batch=1,
+                      workspace=4, cache_path=None):
+    """Build a static-shape INT8 TensorRT engine from a static ONNX export.
+
+    Ultralytics forces dynamic shapes for INT8 engine exports, which the
+    entropy calibrator handles badly, so the engine is built here with the
+    TensorRT builder directly. The engine file gets the same metadata
+    header Ultralytics writes, so YOLO(engine_path) loads it as usual.
+    """
+    import tensorrt as trt
+    import torch
+
+    files = sorted(f for ext in _IMAGE_EXTS for f in glob.glob(os.path.join(images_dir, ext)))
+    if len(files) < batch:
+        raise RuntimeError(f"Need at least {batch} calibration frames in {images_dir}")
+
+    trt_logger = trt.Logger(trt.Logger.INFO)
+    builder = trt.Builder(trt_logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, trt_logger)
+
+    if not parser.parse_from_file(onnx_path):
+        errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+        raise RuntimeError(f"Failed to parse {onnx_path}: {errors}")
+
+    # The whole point of this path: refuse to calibrate a dynamic input
+    input_shape = tuple(network.get_input(0).shape)
+    expected = (batch, 3, *imgsz)
+    if any(d < 0 for d in input_shape) or input_shape != expected:
+        raise RuntimeError(f"ONNX input must be static {expected}, got {input_shape}")
+
+    class _Calibrator(trt.IInt8EntropyCalibrator2):
+        def __init__(self):
+            super().__init__()
+            self.index = 0
+            self.device_input = torch.empty(expected, dtype=torch.float32, device='cuda')
+
+        def get_batch_size(self):
+            return batch
+
+        def get_batch(self, names):
+            if self.index + batch > len(files):
+                return None
+
+            chunk = files[self.index:self.index + batch]
+            self.index += batch
+            host = np.stack([_to_input(cv2.imread(f), imgsz) for f in chunk])
+            self.device_input.copy_(torch.from_numpy(host))
+            return [int(self.device_input.data_ptr())]
+
+        def read_calibration_cache(self):
+            if cache_path and os.path.exists(cache_path):
+                with open(cache_path, 'rb') as f:
+                    return f.read()
+            return None
+
+        def write_calibration_cache(self, cache):
+            if cache_path:
+                with open(cache_path, 'wb') as f:
+                    f.write(cache)
+
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, workspace << 30)
+    config.set_flag(trt.BuilderFlag.INT8)
+    if builder.platform_has_fast_fp16:
+        # Layers that do not quantise well fall back to FP16 instead of FP32
+        config.set_flag(trt.BuilderFlag.FP16)
+    calibrator = _Calibrator()
+    config.int8_calibrator = calibrator
+
+    logger.info(f"Building INT8 engine from {len(files)} calibration frames")
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT INT8 engine build failed")
+
+    # Ultralytics engine header: 4-byte little-endian length + JSON metadata,
+    # taken from the metadata it embedded in the ONNX export
+    import onnx
+    metadata = {p.key: p.value for p in onnx.load(onnx_path).metadata_props}
+    meta = json.dumps(metadata).encode()
+
+    with open(engine_path, 'wb') as f:
+        f.write(len(meta).to_bytes(4, byteorder='little', signed=True))
+        f.write(meta)
+        f.write(serialized)
+
+    logger.info(f"INT8 engine saved: {engine_path} (input {input_shape})")
+    return engine_path
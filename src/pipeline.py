@@ -0,0 +1,143 @@
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the frame source in the queues
+_END = object()
+
+
+def put_latest(q, item):
+    # Keep only the freshest item: drop the queued one if the slot is taken
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(item)
+
+
+class DetectionPipeline:
+    """Runs capture and detection on worker threads.
+
+    capture_fn() returns (ok, frame) like cv2.VideoCapture.read; ok=False
+    ends the stream, frame=None is skipped. detect_fn(frames) takes a list
+    of up to batch_size frames and returns one result dict per frame. The
+    main thread calls get() for (frame, results) pairs, results is None if
+    detection raised. close_fn, if given, runs on the capture thread once it
+    is done with the source, so the source is never touched from two threads.
+    """
+
+    def __init__(self, capture_fn, detect_fn, drop_frames=True, batch_size=1,
+                 close_fn=None):
+        self.capture_fn = capture_fn
+        self.detect_fn = detect_fn
+        self.close_fn = close_fn
+        # Live sources drop stale frames, video files keep every frame
+        self.drop_frames = drop_frames
+        self.batch_size = batch_size
+
+        self.cap_q = queue.Queue(maxsize=1)
+        # Room for one whole batch so its frames can be shown back-to-back
+        self.det_q = queue.Queue(maxsize=batch_size)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._detect_loop, name="detect", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout=5.0):
+        # Returns the names of threads still running after the timeout; while
+        # "capture" is among them the capture source is still in use
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+
+        self._threads = [t for t in self._threads if t.is_alive()]
+        alive = [t.name for t in self._threads]
+        if alive:
+            logger.error(f"Pipeline threads still running: {', '.join(alive)}")
+        return alive
+
+    def get(self, timeout=None):
+        # Returns (frame, results), None at end of stream; raises queue.Empty
+        item = self.det_q.get(timeout=timeout)
+        return None if item is _END else item
+
+    def pending(self):
+        # True if another result is already waiting, e.g. the rest of a batch
+        return not self.det_q.empty()
+
+    def _put(self, q, item):
+        if self.drop_frames and item is not _END:
+            put_latest(q, item)
+            return
+
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set():
+                ok, frame = self.capture_fn()
+
+                if not ok:
+                    break
+                if frame is None:
+                    continue
+
+                self._put(self.cap_q, frame)
+        except Exception as e:
+            logger.error(f"Capture error: {e}")
+        finally:
+            if self.close_fn is not None:
+                try:
+                    self.close_fn()
+                except Exception as e:
+                    logger.error(f"Capture close error: {e}")
+        self._put(self.cap_q, _END)
+
+    def _detect_loop(self):
+        frames = []
+        while not self._stop.is_set():
+            try:
+                frame = self.cap_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            if frame is _END:
+                break
+
+            frames.append(frame)
+            if len(frames) < self.batch_size:
+                continue
+
+            self._detect(frames)
+            frames = []
+
+        # Flush a partial batch left at the end of the stream
+        if frames and not self._stop.is_set():
+            self._detect(frames)
+        self._put(self.det_q, _END)
+
+    def _detect(self, frames):
+        try:
+            results = self.detect_fn(frames)
+        except Exception as e:
+            logger.error(f"Detection error: {e}")
+            results = [None] * len(frames)
+
+        for frame, frame_results in zip(frames, results):
+            self._put(self.det_q, (frame, frame_results))
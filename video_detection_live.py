@@ -2,6 +2,7 @@
 
 import sys
 import cv2
+import queue
 import logging
 import time
 from pathlib import Path
@@ -15,6 +16,14 @@ logger = logging.getLogger(__name__)
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.crack_detector import TrainedCrackDetector
+from src.pipeline import DetectionPipeline
+from src.display import FrameDisplay, StaticText
+
+# Key codes, resolved once
+_Q, _SPACE, _S, _PLUS, _EQ, _MINUS, _UND, _F, _F_UPPER = map(ord, 'q s+=-_fF')
+
+def _noop():
+    return False
 
 def video_detection_live(video_path, confidence=0.4):
 
@@ -63,140 +72,183 @@ def video_detection_live(video_path, confidence=0.4):
     
     frame_count = 0
     total_anomalies = 0
-    anomalies_per_frame = []
+    max_cracks = -1  # so the first detected frame is recorded even with 0 cracks
+    max_frame = 0
     paused = False
     fullscreen = False
     
+    pipeline = None
     try:
+        # Decode and inference run on worker threads; every frame is kept so the
+        # workers simply block while playback is paused
+        pipeline = DetectionPipeline(
+            capture_fn=cap.read,
+            detect_fn=lambda frames: detector.detect_batch(frames, conf=confidence),
+            drop_frames=False,
+            close_fn=cap.release,
+        )
+        pipeline.start()
+        display = FrameDisplay()
+        hud = StaticText()
+    
+        # Create the window up front instead of implicitly on the first imshow
+        window_name = "Live Video Detection"
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        prev_fullscreen = None
+        overlay = None
+        shown_frame = 0
+    
+        # Key handlers return True to stop the loop
+        def quit_fn():
+            logger.info("\nQuitting...")
+            return True
+    
+        def pause_fn():
+            nonlocal paused
+            paused = not paused
+            status = "PAUSED" if paused else "RESUMED"
+            logger.info(f"{status} - Press SPACE to toggle")
+    
+        def save_fn():
+            if overlay is None:
+                return
+            filename = f"detection_live_{shown_frame:04d}.jpg"
+            cv2.imwrite(filename, overlay)
+            logger.info(f"Saved: {filename}")
+    
+        def conf_up_fn():
+            nonlocal confidence
+            confidence = min(1.0, confidence + 0.05)
+            logger.info(f"Confidence: {confidence:.2f}")
+    
+        def conf_down_fn():
+            nonlocal confidence
+            confidence = max(0.0, confidence - 0.05)
+            logger.info(f"Confidence: {confidence:.2f}")
+    
+        def fullscreen_fn():
+            nonlocal fullscreen
+            fullscreen = not fullscreen
+            logger.info(f"Fullscreen: {'ON' if fullscreen else 'OFF'}")
+    
+        keymap = {
+            _Q: quit_fn,
+            _SPACE: pause_fn,
+            _S: save_fn,
+            _PLUS: conf_up_fn,
+            _EQ: conf_up_fn,
+            _MINUS: conf_down_fn,
+            _UND: conf_down_fn,
+            _F: fullscreen_fn,
+            _F_UPPER: fullscreen_fn,
+        }
+    
         while True:
             if not paused:
-                ret, frame = cap.read()
+                try:
+                    item = pipeline.get(timeout=1.0)
+                except queue.Empty:
+                    continue
                 
-                if not ret:
+                if item is None:
                     logger.info("\nVideo finished!")
                     break
                 
+                frame, detection_results = item
                 frame_count += 1
                 
                 # Run detection
-                try:
-                    detection_results = detector.detect(frame, conf=confidence)
+                if detection_results is not None:
                     anomaly_count = detection_results['anomaly_count']
                     frame_annotated = detection_results['image_annotated']
                     cracks = detection_results['cracks']
                     total_anomalies += anomaly_count
-                    anomalies_per_frame.append(anomaly_count)
+                    if anomaly_count > max_cracks:
+                        max_cracks = anomaly_count
+                        max_frame = frame_count
                     
                     if anomaly_count > 0:
                         logger.info(f"Frame {frame_count}: {anomaly_count} crack(s) detected")
-                    
-                except Exception as e:
-                    logger.error(f"Detection error on frame {frame_count}: {e}")
-                    frame_annotated = frame.copy()
+                else:
+                    logger.error(f"Detection failed on frame {frame_count}")
+                    frame_annotated = frame
                     anomaly_count = 0
                 
-                # Add text overlays
-                overlay = frame_annotated.copy()
-                
-                # Frame info
-                frame_text = f"Frame: {frame_count}/{total_frames}"
-                cv2.putText(overlay, frame_text, (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                
-                # Confidence
-                conf_text = f"Confidence: {confidence:.2f}"
-                cv2.putText(overlay, conf_text, (10, 70), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                
-                # Detection status
-                if anomaly_count > 0:
-                    status_text = f"CRACKS FOUND! ({anomaly_count})"
-                    color = (0, 0, 255)  # Red
+                # Only draw frames the 30 FPS display cap will actually show
+                if not display.due():
+                    key = display.poll_key()
                 else:
-                    status_text = "No cracks detected"
-                    color = (0, 255, 0)  # Green
+                    # Add text overlays, drawn in place: result.plot() already returns a fresh array
+                    overlay = frame_annotated
+                    shown_frame = frame_count
                 
-                cv2.putText(overlay, status_text, (10, 110), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 3)
+                    # Frame info
+                    frame_text = f"Frame: {frame_count}/{total_frames}"
+                    cv2.putText(overlay, frame_text, (10, 30), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                 
-                # Playback status
-                status_pause = "PAUSED" if paused else "PLAYING"
-                cv2.putText(overlay, status_pause, (10, 150), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2)
+                    # Detection status
+                    if anomaly_count > 0:
+                        status_text = f"CRACKS FOUND! ({anomaly_count})"
+                        color = (0, 0, 255)  # Red
+                    else:
+                        status_text = "No cracks detected"
+                        color = (0, 255, 0)  # Green
                 
-                # Total stats
-                stats_text = f"Total cracks: {total_anomalies}"
-                cv2.putText(overlay, stats_text, (10, 190), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    cv2.putText(overlay, status_text, (10, 110), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 3)
                 
-                # Time info
-                current_time = frame_count / fps
-                total_time = total_frames / fps
-                time_text = f"Time: {current_time:.1f}s / {total_time:.1f}s"
-                cv2.putText(overlay, time_text, (10, 230), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    # Total stats
+                    stats_text = f"Total cracks: {total_anomalies}"
+                    cv2.putText(overlay, stats_text, (10, 190), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                 
-                # Instructions
-                instructions = [
-                ]
-                for i, instr in enumerate(instructions):
-                    y = overlay.shape[0] - 20
-                    cv2.putText(overlay, instr, (10, y), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
+                    # Time info
+                    current_time = frame_count / fps
+                    total_time = total_frames / fps
+                    time_text = f"Time: {current_time:.1f}s / {total_time:.1f}s"
+                    cv2.putText(overlay, time_text, (10, 230), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                 
-                # Resize for display
-                h, w = overlay.shape[:2]
-                if w > 1400 or h > 900:
-                    scale = min(1400 / w, 900 / h)
-                    overlay = cv2.resize(overlay, (int(w*scale), int(h*scale)))
+                    # Text that only changes on key presses: confidence, playback
+                    # status and instructions are blitted from a cached sprite
+                    conf_text = f"Confidence: {confidence:.2f}"
+                    status_pause = "PAUSED" if paused else "PLAYING"
+                    instructions = [
+                    ]
+                    labels = (
+                        (conf_text, (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2),
+                        (status_pause, (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2),
+                    ) + tuple(
+                        (instr, (10, overlay.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
+                        for instr in instructions
+                    )
+                    hud.draw(overlay, labels)
                 
-                # Display
-                window_name = "Live Video Detection"
-                cv2.imshow(window_name, overlay)
+                    # Resize for display
+                    h, w = overlay.shape[:2]
+                    if w > 1400 or h > 900:
+                        scale = min(1400 / w, 900 / h)
+                        overlay = display.resize(overlay, (int(w*scale), int(h*scale)))
                 
-                # Handle fullscreen
-                if fullscreen:
-                    cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, 
-                                        cv2.WINDOW_FULLSCREEN)
-                else:
-                    cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, 
-                                        cv2.WINDOW_NORMAL)
+                    # Display, capped at 30 FPS
+                    # No FPS-matched wait: detection is the bottleneck, and idle
+                    # gaps between inference calls make the engine slower
+                    key = display.show(window_name, overlay)
                 
-                # Wait for frame time (play at correct FPS)
-                frame_delay = int(1000 / fps)  # milliseconds
-            else:
+                # Handle fullscreen, only when the state changes
+                if fullscreen != prev_fullscreen:
+                    mode = cv2.WINDOW_FULLSCREEN if fullscreen else cv2.WINDOW_NORMAL
+                    cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, mode)
+                    prev_fullscreen = fullscreen
+            elif overlay is not None:
                 # When paused, just wait for input
-                frame_delay = 100
-                cv2.imshow("Live Video Detection", overlay)
-            
-            # Check for key press
-            key = cv2.waitKey(frame_delay) & 0xFF
+                key = display.show(window_name, overlay, delay=100)
+            else:
+                key = display.poll_key(delay=100)
             
-            if key == ord('q'):  # Quit
-                logger.info("\nQuitting...")
+            if keymap.get(key, _noop)():
                 break
-            
-            elif key == ord(' '):  # Pause/Resume
-                paused = not paused
-                status = "PAUSED" if paused else "RESUMED"
-                logger.info(f"{status} - Press SPACE to toggle")
-            
-            elif key == ord('s'):  # Save frame
-                filename = f"detection_live_{frame_count:04d}.jpg"
-                cv2.imwrite(filename, overlay)
-                logger.info(f"Saved: {filename}")
-            
-            elif key == ord('+') or key == ord('='):  # Increase confidence
-                confidence = min(1.0, confidence + 0.05)
-                logger.info(f"Confidence: {confidence:.2f}")
-            
-            elif key == ord('-') or key == ord('_'):  # Decrease confidence
-                confidence = max(0.0, confidence - 0.05)
-                logger.info(f"Confidence: {confidence:.2f}")
-            
-            elif key == ord('f') or key == ord('F'):  # Toggle fullscreen
-                fullscreen = not fullscreen
-                logger.info(f"Fullscreen: {'ON' if fullscreen else 'OFF'}")
     
     except KeyboardInterrupt:
         logger.info("\nInterrution")
@@ -207,7 +259,11 @@ def video_detection_live(video_path, confidence=0.4):
         traceback.print_exc()
     
     finally:
-        cap.release()
+        # The capture thread releases the video once it is done reading it
+        if pipeline is not None:
+            pipeline.stop()
+        else:
+            cap.release()
         cv2.destroyAllWindows()
         
         logger.info(f"  • Frames processed: {frame_count}")
@@ -217,9 +273,7 @@ def video_detection_live(video_path, confidence=0.4):
             avg_cracks = total_anomalies / frame_count
             logger.info(f"Average: {avg_cracks:.2f} cracks/frame")
             
-            if anomalies_per_frame:
-                max_cracks = max(anomalies_per_frame)
-                max_frame = anomalies_per_frame.index(max_cracks) + 1
+            if max_frame > 0:
                 logger.info(f"Max cracks: {max_cracks} (frame {max_frame})")
 
 def main():